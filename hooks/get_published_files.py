@@ -8,18 +8,158 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Autodesk, Inc.
 
-from collections import defaultdict
-import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import weakref
+
 import sgtk
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
+# The results of the synchronous queries, keyed by query, with the time they were cached.
+# The least recently used results are first.
+_CACHE = OrderedDict()
+# The synchronous queries may be executed from the main thread and from background threads,
+# the lock guards the cached results.
+_CACHE_LOCK = threading.Lock()
+
+# The publish_history_group_by_fields setting fields, keyed by app. A new hook instance is
+# created for each hook method call, the fields can't be cached on the instance.
+_GROUP_BY_FIELDS = weakref.WeakKeyDictionary()
+
+# The fields to query, keyed by app, and then by the extra fields they were built for.
+_QUERY_FIELDS = weakref.WeakKeyDictionary()
+
+
+def _get_hashable_query(value):
+    """
+    Return a hashable representation of the given query arguments.
+
+    :param value: The query arguments, e.g. filters, fields or order.
+    :returns: A hashable value.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _get_hashable_query(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_get_hashable_query(v) for v in value)
+    return value
+
+
+def _copy_result(result):
+    """
+    Return a copy of the given query result, so that cached results are not modified.
+
+    :param result: A list of ShotGrid entity dictionaries, an entity dictionary or None.
+    :returns: A copy of the result.
+    """
+    if isinstance(result, list):
+        return [dict(r) for r in result]
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def _get_hashable_value(value):
+    """
+    Return a hashable representation of the given ShotGrid field value.
+
+    Entity dictionaries are represented by their type and id.
+
+    :param value: The ShotGrid field value.
+    :returns: A hashable value.
+    """
+    if isinstance(value, dict):
+        return (value.get("type"), value.get("id"))
+    if isinstance(value, list):
+        return tuple(_get_hashable_value(v) for v in value)
+    return value
+
+
+def _get_any_value_filter(field, values):
+    """
+    Return a filter matching any of the given values for the given field.
+
+    If the values are entities of a single type, they are matched by their ids, e.g.
+    ``["entity.Shot.id", "in", [1, 2]]``, which is smaller than the list of entity
+    dictionaries and doesn't need to be split by entity type on the server side.
+
+    :param field: The field to filter on.
+    :param values: The values to match, which may contain None to also match Published
+        Files without a value for the field.
+    :returns: A filter as a list, or a dictionary for a filter group.
+    """
+    not_none_values = [value for value in values if value is not None]
+    if not not_none_values:
+        return [field, "is", None]
+
+    entity_types = {
+        value.get("type") if isinstance(value, dict) else None
+        for value in not_none_values
+    }
+    entity_type = entity_types.pop() if len(entity_types) == 1 else None
+    if entity_type:
+        in_filter = [
+            "%s.%s.id" % (field, entity_type),
+            "in",
+            sorted(value["id"] for value in not_none_values),
+        ]
+    else:
+        in_filter = [field, "in", not_none_values]
+
+    if len(not_none_values) == len(values):
+        return in_filter
+    return {
+        "filter_operator": "any",
+        "filters": [in_filter, [field, "is", None]],
+    }
+
 
 class GetPublishedFiles(HookBaseClass):
     """
     Hook called to retrieve the Published Files for the items in the scene.
     """
 
+    # The fields always returned when querying the Published Files history of items.
+    REQUIRED_FIELDS = (
+        "id",
+        "type",
+        "version_number",
+        "path",
+        "name",
+        "entity",
+        "task",
+        "published_file_type",
+        "created_at",
+    )
+
+    # The number of seconds the results of synchronous queries are cached.
+    CACHE_TIMEOUT = 5
+    # The maximum number of query results cached.
+    CACHE_MAX_SIZE = 64
+
+    # Above this number of paths, Published Files are retrieved in parallel chunks of
+    # FIND_PUBLISH_CHUNK_SIZE paths, using at most FIND_PUBLISH_MAX_WORKERS threads.
+    FIND_PUBLISH_PARALLEL_THRESHOLD = 500
+    FIND_PUBLISH_CHUNK_SIZE = 250
+    FIND_PUBLISH_MAX_WORKERS = 4
+
+    @property
+    def group_by_fields(self):
+        """
+        Get the fields defined by the publish_history_group_by_fields setting.
+
+        The setting is only read once per app, since it is not expected to change.
+        """
+        group_by_fields = _GROUP_BY_FIELDS.get(self.parent)
+        if group_by_fields is None:
+            group_by_fields = tuple(
+                self.parent.get_setting("publish_history_group_by_fields")
+            )
+            _GROUP_BY_FIELDS[self.parent] = group_by_fields
+        return group_by_fields
+
     def get_published_files_for_items_data(self, items_data, fields, filters=None):
         """
         Return the Published Files for the given items data.
@@ -48,18 +188,72 @@ class GetPublishedFiles(HookBaseClass):
         """
         if not items_data:
             return []
-        file_paths = [o["path"] for o in items_data]
-        publishes = sgtk.util.find_publish(
-            self.sgtk, file_paths, fields=fields, filters=filters, only_current_project=False
+        # Multiple scene objects can reference the same file, only query each path once.
+        file_paths = list({o["path"] for o in items_data})
+        self.logger.debug(
+            "Retrieving Published Files for %d unique paths from %d items",
+            len(file_paths),
+            len(items_data),
         )
+        publishes = self._find_publish(file_paths, fields, filters)
         published_items_data = []
         for item_data in items_data:
-            if item_data["path"] in publishes:
-                item_data["sg_data"] = publishes[item_data["path"]]
+            # Published Files are always dictionaries, a single lookup is enough.
+            sg_data = publishes.get(item_data["path"])
+            if sg_data is not None:
+                item_data["sg_data"] = sg_data
                 published_items_data.append(item_data)
         return published_items_data
 
-    def get_published_files_for_items(self, items, data_retriever=None, filters=None):
+    def _find_publish(self, file_paths, fields, filters):
+        """
+        Return the Published Files for the given paths.
+
+        Large lists of paths are split in chunks which are queried in parallel. Each thread
+        uses its own ShotGrid connection.
+
+        :param file_paths: A list of paths to find Published Files for.
+        :param fields: A list of fields to query from SG.
+        :param filters: An optional list of filters to use when querying SG.
+        :returns: A dictionary where keys are paths and values are Published Files.
+        """
+        if len(file_paths) <= self.FIND_PUBLISH_PARALLEL_THRESHOLD:
+            return sgtk.util.find_publish(
+                self.sgtk,
+                file_paths,
+                fields=fields,
+                filters=filters,
+                only_current_project=False,
+            )
+
+        chunk_size = self.FIND_PUBLISH_CHUNK_SIZE
+        chunks = [
+            file_paths[i : i + chunk_size]
+            for i in range(0, len(file_paths), chunk_size)
+        ]
+        self.logger.debug(
+            "Retrieving Published Files in %d chunks of %d paths",
+            len(chunks),
+            chunk_size,
+        )
+        publishes = {}
+        with ThreadPoolExecutor(max_workers=self.FIND_PUBLISH_MAX_WORKERS) as executor:
+            for result in executor.map(
+                lambda chunk: sgtk.util.find_publish(
+                    self.sgtk,
+                    chunk,
+                    fields=fields,
+                    filters=filters,
+                    only_current_project=False,
+                ),
+                chunks,
+            ):
+                publishes.update(result)
+        return publishes
+
+    def get_published_files_for_items(
+        self, items, data_retriever=None, filters=None, extra_fields=None
+    ):
         """
         Make an API request to get all published files for the given file items.
 
@@ -74,66 +268,62 @@ class GetPublishedFiles(HookBaseClass):
         :param data_retriever: If provided, the api request will be async. The default value
             will execute the api request synchronously.
         :param filters: An optional list of filters to use when querying SG.
+        :param extra_fields: An optional list of fields to query from SG, in addition to
+            the required fields and the publish_history_group_by_fields setting fields.
 
         :returns: If the request is async, then the request task id is returned, else the
-            published file data result from the api request.
+            published file data result from the api request. Published files are not
+            returned in any particular order.
         """
-        self.logger.debug("Retrieving Published files for items %s" % items)
+        self.logger.debug("Retrieving Published files for items %s", items)
         if not items:
             return {}
 
         # Build the filters to get all published files at once for all the file items.
-        group_by_fields = self.parent.get_setting("publish_history_group_by_fields")
-        sg_data_by_field = defaultdict(list)
-        for file_item in items:
-            for field in group_by_fields:
-                if file_item.sg_data.get(field):
-                    sg_data_by_field[field].append(
-                        file_item.sg_data[field]
-                    )
-                else:
-                    # If there's no data for this field, we still need to make sure
-                    # there's an empty list for it to build the filters.
-                    sg_data_by_field[field] = []
-
-        # Let's copy the filters so we don't modify the original list.
-        filters = copy.deepcopy(filters) if filters else []
+        sg_rows = [file_item.sg_data for file_item in items]
+        # Many items share the same values (e.g. project, entity), map the values by their
+        # hashable form so that each value is only sent once in the filters. Items without a
+        # value for a field add None to its values.
+        sg_data_by_field = {field: {} for field in self.group_by_fields}
+        for sg_data in sg_rows:
+            for field, values in sg_data_by_field.items():
+                value = sg_data.get(field)
+                values[_get_hashable_value(value)] = value
 
+        # Let's copy the filters so we don't modify the original list. Filters are only
+        # appended to the list, so a shallow copy is enough.
+        filters = list(filters) if filters else []
+
+        # Match any of the values, including None: if no item has a value for a field,
+        # only published files without a value match.
         for field, values in sg_data_by_field.items():
-            if values:
-                filters.append([field, "in", values])
-            else:
-                filters.append([field, "is", None])
-
-        # Get the query fields. This assumes all file items in the list have the same fields.
-        fields = list(items[0].sg_data.keys()) + ["version_number", "path"]
-        self.logger.debug("Retrieving published files with %s, %s" % (filters, fields))
-        # Highest version first or latest one
-        order = [
-            {"field_name": "version_number", "direction": "desc"},
-            {"field_name": "created_at", "direction": "desc"}
-        ]
+            filters.append(_get_any_value_filter(field, list(values.values())))
+
+        fields = self._get_query_fields(extra_fields)
+        self.logger.debug("Retrieving published files with %s, %s", filters, fields)
+        # The results are not ordered by the server, sorting them is cheaper client side.
         if data_retriever:
             # Execute async and return the background task id.
             result = data_retriever.execute_find(
                 "PublishedFile",
                 filters=filters,
                 fields=fields,
-                order=order,
             )
             return result
 
         # No data retriever, execute synchronously and return the published file data result.
-        result = self.sgtk.shotgun.find(
+        result = self._execute_sync(
+            "find",
             "PublishedFile",
             filters=filters,
             fields=fields,
-            order=order,
         )
-        self.logger.debug("Retrieved %d Published Files" % len(result))
+        self.logger.debug("Retrieved %d Published Files", len(result))
         return result
 
-    def get_latest_published_file(self, item, data_retriever=None, **kwargs):
+    def get_latest_published_file(
+        self, item, data_retriever=None, extra_fields=None, **kwargs
+    ):
         """
         Query ShotGrid to get the latest Published file for the given item.
 
@@ -144,22 +334,24 @@ class GetPublishedFiles(HookBaseClass):
         :param item: :class`FileItem` object we want to get the latest published file for
         :param data_retriever: If provided, the api request will be async. The default value
             will execute the api request synchronously.
+        :param extra_fields: An optional list of fields to query from SG, in addition to
+            the required fields and the publish_history_group_by_fields setting fields.
 
         :returns: If the request is async, then the request task id is returned, else the
             published file data result from the api request.
         """
 
-        group_by_fields = self.parent.get_setting("publish_history_group_by_fields")
+        group_by_fields = self.group_by_fields
         filters = []
         for field in group_by_fields:
             filters.append([field, "is", item.sg_data[field]])
-        fields = list(item.sg_data.keys()) + ["version_number", "path"]
+        fields = self._get_query_fields(extra_fields)
         # Highest version first or latest one
         order = [
             {"field_name": "version_number", "direction": "desc"},
             {"field_name": "created_at", "direction": "desc"}
         ]
-        self.logger.debug("Retrieving published files with %s, %s" % (filters, fields))
+        self.logger.debug("Retrieving published files with %s, %s", filters, fields)
 
         # todo: check if this work with url published files
         # todo: need to check for path comparison?
@@ -171,11 +363,69 @@ class GetPublishedFiles(HookBaseClass):
                 order=order,
             )
         else:
-            result = self.sgtk.shotgun.find_one(
+            result = self._execute_sync(
+                "find_one",
                 "PublishedFile",
                 filters=filters,
                 fields=fields,
                 order=order,
             )
-            self.logger.debug("Found latest Published File %s" % result)
+            self.logger.debug("Found latest Published File %s", result)
         return result
+
+    def _get_query_fields(self, extra_fields=None):
+        """
+        Return the fields to query when retrieving the Published Files history of items.
+
+        The fields are only built once for given extra fields.
+
+        :param extra_fields: An optional list of fields to query in addition to the
+            required fields and the publish_history_group_by_fields setting fields.
+        :returns: A list of fields.
+        """
+        key = tuple(extra_fields) if extra_fields else ()
+        query_fields = _QUERY_FIELDS.setdefault(self.parent, {})
+        fields = query_fields.get(key)
+        if fields is None:
+            # Remove duplicates while preserving the fields order.
+            fields = tuple(
+                dict.fromkeys(self.REQUIRED_FIELDS + self.group_by_fields + key)
+            )
+            query_fields[key] = fields
+        return list(fields)
+
+    def clear_cache(self):
+        """
+        Clear the cached results of the synchronous queries.
+
+        This should be called when the data is explicitly refreshed.
+        """
+        with _CACHE_LOCK:
+            _CACHE.clear()
+
+    def _execute_sync(self, method_name, *args, **kwargs):
+        """
+        Execute a ShotGrid API method and return its result.
+
+        Identical queries executed within :attr:`CACHE_TIMEOUT` seconds return the cached
+        result instead of querying ShotGrid again.
+
+        :param method_name: The ShotGrid API method to execute, "find" or "find_one".
+        :returns: The result of the ShotGrid API method.
+        """
+        cache_key = _get_hashable_query((method_name, args, kwargs))
+        with _CACHE_LOCK:
+            cached = _CACHE.pop(cache_key, None)
+            if cached and time.time() - cached[0] < self.CACHE_TIMEOUT:
+                # Re-insert the result as the most recently used one.
+                _CACHE[cache_key] = cached
+                return _copy_result(cached[1])
+
+        # Don't hold the lock while querying ShotGrid.
+        result = getattr(self.sgtk.shotgun, method_name)(*args, **kwargs)
+
+        with _CACHE_LOCK:
+            _CACHE[cache_key] = (time.time(), result)
+            while len(_CACHE) > self.CACHE_MAX_SIZE:
+                _CACHE.popitem(last=False)
+        return _copy_result(result)
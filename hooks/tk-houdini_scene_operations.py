@@ -8,12 +8,53 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Autodesk, Inc.
 
-import os
+import posixpath
 import sgtk
 import hou
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
+# The alembic nodes and their file parm found by the last scene scan, keyed by the node
+# session id, so that they don't need to be looked up again when updating them.
+_ALEMBIC_NODES_CACHE = {}
+
+# Translation table to convert backslashes to forward slashes in a single pass.
+_SLASH_TABLE = str.maketrans("\\", "/")
+
+# Unexpanded alembic file names which can't reference a published file.
+_DEFAULT_ALEMBIC_FILE_NAMES = frozenset(["", "default.abc", "$HIP/default.abc"])
+
+# The alembic SOP node type, looked up on first use.
+_ALEMBIC_NODE_TYPE = None
+
+
+def _get_alembic_node_type():
+    """
+    Get the alembic SOP node type.
+
+    :returns: The alembic :class:`hou.SopNodeType`.
+    """
+    global _ALEMBIC_NODE_TYPE
+    if _ALEMBIC_NODE_TYPE is None:
+        _ALEMBIC_NODE_TYPE = hou.nodeType(hou.sopNodeTypeCategory(), "alembic")
+    return _ALEMBIC_NODE_TYPE
+
+
+def _normalize_path(path):
+    """
+    Normalize the given path to use forward slashes.
+
+    Houdini always uses forward slashes in paths, the path is only fully normalized if
+    it contains redundant separators or up-level references.
+
+    :param path: The path to normalize.
+    :returns: The normalized path.
+    """
+    path = path.translate(_SLASH_TABLE)
+    if "//" in path or "/./" in path or "/../" in path or path.endswith(("/.", "/..")):
+        path = posixpath.normpath(path)
+    return path
+
 
 class BreakdownSceneOperations(HookBaseClass):
     """
@@ -46,22 +87,42 @@ class BreakdownSceneOperations(HookBaseClass):
         """
 
         items = []
+        _ALEMBIC_NODES_CACHE.clear()
+        # Many nodes can reference the same file, only normalize each path once.
+        normalized_paths = {}
 
         # get a list of all regular lembic nodes in the file
-        alembic_nodes = hou.nodeType(hou.sopNodeTypeCategory(), "alembic").instances()
+        alembic_nodes = _get_alembic_node_type().instances()
 
         # return an item for each alembic node found. the breakdown app will check
         # the paths of each looking for a template match and a newer version.
         for alembic_node in alembic_nodes:
 
             file_parm = alembic_node.parm("fileName")
-            file_path = os.path.normpath(file_parm.eval())
+            # Checking the unexpanded string is cheap, don't evaluate the parm for nodes
+            # which don't reference a file. Parms with keyframes or an expression don't
+            # have an unexpanded string, they are always evaluated.
+            try:
+                if file_parm.unexpandedString() in _DEFAULT_ALEMBIC_FILE_NAMES:
+                    continue
+            except hou.OperationFailed:
+                pass
+
+            session_id = alembic_node.sessionId()
+            _ALEMBIC_NODES_CACHE[session_id] = (alembic_node, file_parm)
+
+            raw_path = file_parm.eval()
+            file_path = normalized_paths.get(raw_path)
+            if file_path is None:
+                file_path = _normalize_path(raw_path)
+                normalized_paths[raw_path] = file_path
 
             items.append(
                 {
                     "node_name": alembic_node.path(),
                     "node_type": "alembic",
                     "path": file_path,
+                    "extra_data": {"session_id": session_id},
                 }
             )
 
@@ -85,17 +146,44 @@ class BreakdownSceneOperations(HookBaseClass):
         sg_data = item["sg_data"]
         if not sg_data or not sg_data.get("path", {}).get("local_path", None):
             return False
-        path = sg_data["path"]["local_path"]
-
-        path = path.replace("\\", "/")
+        path = sg_data["path"]["local_path"].translate(_SLASH_TABLE)
 
         if node_type == "alembic":
-            alembic_node = hou.node(node_name)
+            file_parm = self._get_alembic_file_parm(node_name, item.get("extra_data"))
             self.logger.debug(
                 "Updating alembic node '{}' to: {}".format(node_name, path)
             )
-            alembic_node.parm("fileName").set(path)
+            file_parm.set(path)
             return path
 
         # No update done
         return False
+
+    def _get_alembic_file_parm(self, node_name, extra_data):
+        """
+        Get the file parm of an alembic node.
+
+        The node is looked up from its session id, if available, which is cheaper than
+        looking it up from its path.
+
+        :param node_name: The path of the alembic node.
+        :param extra_data: The extra data of the item, as generated by the scan_scene hook.
+        :returns: The alembic node file parm.
+        """
+
+        session_id = (extra_data or {}).get("session_id")
+        if session_id is None:
+            return hou.node(node_name).parm("fileName")
+
+        cached = _ALEMBIC_NODES_CACHE.get(session_id)
+        if cached:
+            alembic_node, file_parm = cached
+            try:
+                # Make sure the node was not deleted since the scene was scanned.
+                alembic_node.sessionId()
+                return file_parm
+            except hou.ObjectWasDeleted:
+                del _ALEMBIC_NODES_CACHE[session_id]
+
+        alembic_node = hou.nodeBySessionId(session_id) or hou.node(node_name)
+        return alembic_node.parm("fileName")
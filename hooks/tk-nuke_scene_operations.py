@@ -14,6 +14,33 @@ import sgtk
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
+# The classes of the nodes referencing files, in the order they are listed.
+_FILE_NODE_CLASSES = ("Read", "ReadGeo2", "Camera2")
+
+# Paths only need their separators converted if the OS separator is not "/".
+_SEP = os.path.sep
+_NEEDS_SLASH_FIX = _SEP != "/"
+
+
+def _normpath(path):
+    """
+    Convert the forward slashes of the given Nuke path to the OS separator.
+
+    :param path: The path to convert.
+    :returns: The path using the OS separator.
+    """
+    return path.replace("/", _SEP) if _NEEDS_SLASH_FIX else path
+
+
+def _to_nuke_path(path):
+    """
+    Convert the OS separators of the given path to forward slashes, as used by Nuke.
+
+    :param path: The path to convert.
+    :returns: The path using forward slashes.
+    """
+    return path.replace(_SEP, "/") if _NEEDS_SLASH_FIX else path
+
 
 class BreakdownSceneOperations(HookBaseClass):
     """
@@ -23,6 +50,19 @@ class BreakdownSceneOperations(HookBaseClass):
     geometry nodes and camera nodes.
     """
 
+    def __init__(self, *args, **kwargs):
+        """Class constructor."""
+
+        super(BreakdownSceneOperations, self).__init__(*args, **kwargs)
+
+        # The methods updating the items, keyed by node type.
+        self._update_handlers = {
+            "Read": self._update_node,
+            "ReadGeo2": self._update_node,
+            "Camera2": self._update_node,
+            "Clip": self._update_clip,
+        }
+
     def scan_scene(self):
         """
         The scan scene method is executed once at startup and its purpose is
@@ -59,7 +99,7 @@ class BreakdownSceneOperations(HookBaseClass):
                 for clip in project.clipsBin().clips():
                     files = clip.activeItem().mediaSource().fileinfos()
                     for file in files:
-                        path = file.filename().replace("/", os.path.sep)
+                        path = _normpath(file.filename())
                         nodes.append(
                             dict(
                                 node_name=clip.activeItem().name(),
@@ -73,33 +113,22 @@ class BreakdownSceneOperations(HookBaseClass):
         if self.parent.engine.hiero_enabled:
             return nodes
 
-        # first let's look at the read nodes
-        for node in nuke.allNodes("Read"):
-
-            node_name = node.name()
-
-            # note! We are getting the "abstract path", so contains
-            # %04d and %V rather than actual values.
-            path = node.knob("file").value().replace("/", os.path.sep)
-            nodes.append({"node_name": node_name, "node_type": "Read", "path": path})
-
-        # then the read geometry nodes
-        for node in nuke.allNodes("ReadGeo2"):
-
-            node_name = node.name()
-
-            path = node.knob("file").value().replace("/", os.path.sep)
-            nodes.append(
-                {"node_name": node_name, "node_type": "ReadGeo2", "path": path}
-            )
-
-        # then the read camera nodes
-        for node in nuke.allNodes("Camera2"):
-
-            node_name = node.name()
-
-            path = node.knob("file").value().replace("/", os.path.sep)
-            nodes.append({"node_name": node_name, "node_type": "Camera2", "path": path})
+        # Traverse the node graph only once and group the read, read geometry and
+        # camera nodes by their class.
+        nodes_by_class = {node_class: [] for node_class in _FILE_NODE_CLASSES}
+        for node in nuke.allNodes():
+            class_nodes = nodes_by_class.get(node.Class())
+            if class_nodes is not None:
+                class_nodes.append(node)
+
+        for node_class in _FILE_NODE_CLASSES:
+            for node in nodes_by_class[node_class]:
+                # note! We are getting the "abstract path", so contains
+                # %04d and %V rather than actual values.
+                path = _normpath(node.knob("file").value())
+                nodes.append(
+                    {"node_name": node.name(), "node_type": node_class, "path": path}
+                )
 
         return nodes
 
@@ -116,7 +145,42 @@ class BreakdownSceneOperations(HookBaseClass):
         :returns: The path which was set on the item or ``False`` if no update was done.
         """
 
-        node_type_list = ["Read", "ReadGeo2", "Camera2"]
+        return self._update_item(item)
+
+    def update_batch(self, items):
+        """
+        Perform replacements for a list of scene items passed from the app.
+
+        The Nuke nodes are looked up by name from a single traversal of the node graph,
+        instead of one lookup per item.
+
+        :param items: List of dictionaries on the same form as the item passed to the
+                      update method.
+        :returns: For each item, the path which was set on the item or ``False`` if no
+                  update was done.
+        """
+
+        nodes_by_name = None
+        results = []
+        for item in items:
+            if item["node_type"] not in _FILE_NODE_CLASSES:
+                results.append(self._update_item(item))
+                continue
+            if nodes_by_name is None:
+                nodes_by_name = {node.name(): node for node in nuke.allNodes()}
+            results.append(
+                self._update_item(item, node=nodes_by_name.get(item["node_name"]))
+            )
+        return results
+
+    def _update_item(self, item, **handler_kwargs):
+        """
+        Update a scene item with the handler registered for its node type.
+
+        :param item: Dictionary on the same form as the item passed to the update method.
+        :param handler_kwargs: Additional keyword arguments passed to the handler.
+        :returns: The path which was set on the item or ``False`` if no update was done.
+        """
 
         node_name = item["node_name"]
         node_type = item["node_type"]
@@ -124,18 +188,42 @@ class BreakdownSceneOperations(HookBaseClass):
         sg_data = item["sg_data"]
         if not sg_data or not sg_data.get("path", {}).get("local_path", None):
             return False
-        path = sg_data["path"]["local_path"].replace(os.path.sep, "/")
+        path = _to_nuke_path(sg_data["path"]["local_path"])
 
-        if node_type in node_type_list:
-            self.logger.debug("Node %s: Updating to version %s" % (node_name, path))
+        handler = self._update_handlers.get(node_type)
+        if handler is None:
+            # No update done
+            return False
+        return handler(node_name, path, extra_data, **handler_kwargs)
+
+    def _update_node(self, node_name, path, extra_data, node=None):
+        """
+        Update the file of a read, read geometry or camera node.
+
+        :param node_name: The name of the node to update.
+        :param path: The path to set on the node.
+        :param extra_data: The extra data of the item, as generated by the scan_scene hook.
+        :param node: The node to update, if already known, otherwise it is looked up by name.
+        :returns: The path which was set on the node.
+        """
+
+        self.logger.debug("Node %s: Updating to version %s" % (node_name, path))
+        if node is None:
             node = nuke.toNode(node_name)
-            node.knob("file").setValue(path)
-            return path
-
-        if node_type == "Clip":
-            self.logger.debug("Clip %s: Updating to version %s" % (node_name, path))
-            clip = extra_data["clip"]
-            clip.reconnectMedia(path)
-            return path
-        # No update done
-        return False
+        node.knob("file").setValue(path)
+        return path
+
+    def _update_clip(self, node_name, path, extra_data):
+        """
+        Reconnect the media of a Nuke Studio or Hiero clip.
+
+        :param node_name: The name of the clip to update.
+        :param path: The path to reconnect the clip media to.
+        :param extra_data: The extra data of the item, as generated by the scan_scene hook.
+        :returns: The path which was set on the clip.
+        """
+
+        self.logger.debug("Clip %s: Updating to version %s" % (node_name, path))
+        clip = extra_data["clip"]
+        clip.reconnectMedia(path)
+        return path
@@ -14,6 +14,10 @@ import sgtk
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
+# The references found by the last scene scan, keyed by their object id. A new hook instance
+# is created for each hook method call, the index can't be kept on the instance.
+_REFS_BY_ID = {}
+
 
 class BreakdownSceneOperations(HookBaseClass):
     """A hook to perform scene operations in VRED necessary for Breakdown 2 App."""
@@ -23,12 +27,31 @@ class BreakdownSceneOperations(HookBaseClass):
 
         super(BreakdownSceneOperations, self).__init__(*args, **kwargs)
 
-        self._vredpy = self.parent.engine.vredpy
+        # The VRED Python API, resolved on first use.
+        self.__vredpy = None
+
+        # The methods updating the references, keyed by node type.
+        self._update_handlers = {
+            "source_reference": self._update_source_reference,
+            "smart_reference": self._update_smart_reference,
+        }
 
         # Keep track of the scene change callbacks that are registered, so that they can be
         # disconnected at a later time.
         self._on_references_changed_cb = None
 
+    @property
+    def _vredpy(self):
+        """
+        Get the VRED Python API from the engine.
+
+        It is only resolved when first needed, so that the hook can be created before the
+        VRED API is available.
+        """
+        if self.__vredpy is None:
+            self.__vredpy = self.parent.engine.vredpy
+        return self.__vredpy
+
     def scan_scene(self):
         """
         The scan scene method is executed once at startup and its purpose is
@@ -53,12 +76,22 @@ class BreakdownSceneOperations(HookBaseClass):
         """
 
         refs = []
+        reference_service = self._vredpy.vrReferenceService
+
+        # Index the references by id and collect the ids of the references which are the
+        # children of another reference in a single pass.
+        _REFS_BY_ID.clear()
+        child_ids = set()
+        for r in reference_service.getSceneReferences():
+            _REFS_BY_ID[r.getObjectId()] = r
+            child_ids.update(
+                child.getObjectId() for child in reference_service.getSubReferences(r)
+            )
 
-        for r in self._vredpy.vrReferenceService.getSceneReferences():
+        for ref_id, r in _REFS_BY_ID.items():
 
             # we only want to keep the top references
-            has_parent = self._vredpy.vrReferenceService.getParentReferences(r)
-            if has_parent:
+            if ref_id in child_ids:
                 continue
 
             if r.hasSmartReference():
@@ -77,7 +110,7 @@ class BreakdownSceneOperations(HookBaseClass):
                         "node_name": r.getName(),
                         "node_type": node_type,
                         "path": path,
-                        "extra_data": {"node_id": r.getObjectId()},
+                        "extra_data": {"node_id": ref_id},
                     }
                 )
 
@@ -109,16 +142,35 @@ class BreakdownSceneOperations(HookBaseClass):
             self.logger.error("Couldn't get reference node named {}".format(node_name))
             return
 
-        new_node_name = os.path.splitext(os.path.basename(path))[0]
+        handler = self._update_handlers.get(node_type)
+        if handler is None:
+            return None
+        return handler(ref_node, path)
 
-        if node_type == "source_reference":
-            ref_node.setSourcePath(path)
-            ref_node.loadSourceReference()
-            ref_node.setName(new_node_name)
-            return path
-        elif node_type == "smart_reference":
-            ref_node.setSmartPath(path)
-            self._vredpy.vrReferenceService.reimportSmartReferences([ref_node])
+    def _update_source_reference(self, ref_node, path):
+        """
+        Update a source reference to the given path, and rename it after the file.
+
+        :param ref_node: The reference node to update.
+        :param path: The path to load in the reference.
+        :returns: The path which was set on the reference.
+        """
+
+        ref_node.setSourcePath(path)
+        ref_node.loadSourceReference()
+        ref_node.setName(os.path.splitext(os.path.basename(path))[0])
+        return path
+
+    def _update_smart_reference(self, ref_node, path):
+        """
+        Update a smart reference to the given path.
+
+        :param ref_node: The reference node to update.
+        :param path: The path to reimport in the reference.
+        """
+
+        ref_node.setSmartPath(path)
+        self._vredpy.vrReferenceService.reimportSmartReferences([ref_node])
 
     def register_scene_change_callback(self, scene_change_callback):
         """
@@ -134,10 +186,13 @@ class BreakdownSceneOperations(HookBaseClass):
         :type scene_change_callback: function
         """
 
+        def on_references_changed(nodes=None):
+            # The references may have been added or removed.
+            _REFS_BY_ID.clear()
+            scene_change_callback()
+
         # Keep track of the callback so that it can be disconnected later
-        self._on_references_changed_cb = (
-            lambda nodes=None, cb=scene_change_callback: cb()
-        )
+        self._on_references_changed_cb = on_references_changed
 
         # Set up the signal/slot connection to potentially call the scene change callback
         # based on how the references have cahnged.
@@ -178,11 +233,18 @@ class BreakdownSceneOperations(HookBaseClass):
 
     def get_reference_by_id(self, ref_id):
         """
-        Get a reference node from its name.
+        Get a reference node from its object id.
 
-        :param ref_name: Name of the reference we want to get the associated node from
-        :returns: The reference node associated to the reference name
+        The references found by the last scene scan are looked up first, the scene
+        references are only searched if the reference is not found among them.
+
+        :param ref_id: Object id of the reference we want to get the associated node from
+        :returns: The reference node associated to the reference id
         """
+        ref = _REFS_BY_ID.get(ref_id)
+        if ref is not None and ref.isValid():
+            return ref
+
         ref_list = self._vredpy.vrReferenceService.getSceneReferences()
         for r in ref_list:
             if r.getObjectId() == ref_id:
@@ -175,10 +175,10 @@ class UpdateToLatestVersionAction(Action):
         if not self._file_items:
             return
 
-        for file_item in self._file_items:
-            # Call the manager to update the file item object to the latest version.
-            do_update = self._manager.update_to_latest_version(file_item)
+        # Call the manager to update the file item objects to the latest version.
+        updates = self._manager.update_items(self._file_items)
 
+        for file_item, do_update in zip(self._file_items, updates):
             if do_update:
                 # The file item object that the model holds was updated by the manager.
                 # Emit a signal that the data has changed.
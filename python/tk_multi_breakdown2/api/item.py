@@ -150,3 +150,4 @@ class FileItem(object):
             "extra_data": self.extra_data,
             "sg_data": self.sg_data,
         }
+
@@ -8,23 +8,57 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Autodesk, Inc.
 
+from collections import OrderedDict
 import copy
+import inspect
+import os
+import threading
+import time
 
 import sgtk
 
 from .item import FileItem
 from .. import constants
 
+# Only time the manager methods, which can be called repeatedly from the UI event loop, when
+# the TK_BREAKDOWN_TIME environment variable is set.
+_timed = (
+    sgtk.LogManager.log_timing
+    if os.environ.get("TK_BREAKDOWN_TIME")
+    else (lambda func: func)
+)
+
 
 class BreakdownManager(object):
     """This class is used for managing and executing file updates."""
 
+    # The maximum number of published files query results cached.
+    CACHE_MAX_SIZE = 32
+
     def __init__(self, bundle):
         """Initialize the manager."""
 
         self._bundle = bundle
 
-    @sgtk.LogManager.log_timing
+        # The results of the published files queries, keyed by query, with the time they
+        # were cached. The least recently used results are first.
+        self._pf_cache = OrderedDict()
+
+        # The published files queries may be executed in background tasks, the lock guards
+        # the cached results.
+        self._cache_lock = threading.Lock()
+
+        # The number of seconds the query results are cached, caching is disabled by default.
+        self._cache_timeout = bundle.get_setting("published_file_cache_timeout", 0)
+
+        # The hook instances, keyed by hook setting name, only created to check the
+        # methods they implement.
+        self._hook_instances = {}
+
+        # The published file fields, read from the settings on first use.
+        self._published_file_fields = None
+
+    @_timed
     def scan_scene(self, execute_in_main_thread=True):
         """
         Scan the current scene to return a list of scene references.
@@ -60,7 +94,7 @@ class BreakdownManager(object):
         # Execute in the current thread
         return self._bundle.execute_hook_method("hook_scene_operations", "scan_scene")
 
-    @sgtk.LogManager.log_timing
+    @_timed
     def get_published_files_for_items_data(
         self, items_data, extra_fields=None
     ):
@@ -82,7 +116,24 @@ class BreakdownManager(object):
         if extra_fields is not None:
             fields += extra_fields
 
-        return self._bundle.execute_hook_method(
+        cache_key = (
+            "items_data",
+            tuple(
+                (data.get("node_name"), data.get("node_type"), data.get("path"))
+                for data in items_data
+            ),
+            self._get_hashable(fields),
+            self._get_hashable(filters),
+        )
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            published_items_data = []
+            for index, sg_data in cached:
+                items_data[index]["sg_data"] = dict(sg_data)
+                published_items_data.append(items_data[index])
+            return published_items_data
+
+        published_items_data = self._bundle.execute_hook_method(
             "hook_get_published_files",
             "get_published_files_for_items_data",
             items_data=items_data,
@@ -90,6 +141,23 @@ class BreakdownManager(object):
             filters=filters,
         )
 
+        # Only cache the result if a Published File was found for every item data, so that
+        # newly published files are found on the next call, and if the items data were
+        # updated in place, so that the Published Files can be applied again to the same
+        # items data.
+        indexes = {id(data): index for index, data in enumerate(items_data)}
+        if len(published_items_data or []) == len(indexes) and all(
+            id(data) in indexes for data in published_items_data
+        ):
+            self._set_cached_result(
+                cache_key,
+                [
+                    (indexes[id(data)], dict(data["sg_data"]))
+                    for data in published_items_data
+                ],
+            )
+        return published_items_data
+
     def get_file_items(self, scene_objects):
         """
         Get the file item objects for the given scene objects.
@@ -121,11 +189,14 @@ class BreakdownManager(object):
         file_items = []
 
         for obj in scene_objects:
-            if obj.get("sg_data"):
+            sg_data = obj.get("sg_data")
+            if sg_data:
                 file_item = FileItem(obj["node_name"], obj["node_type"], obj["path"])
                 file_item.extra_data = obj.get("extra_data")
                 # Make a shallow copy in case it is shared between multiple items.
-                file_item.sg_data = copy.copy(obj["sg_data"])
+                file_item.sg_data = (
+                    sg_data.copy() if isinstance(sg_data, dict) else copy.copy(sg_data)
+                )
                 file_items.append(file_item)
 
         return file_items
@@ -139,9 +210,12 @@ class BreakdownManager(object):
         :rtype: list<str>
         """
 
-        return constants.PUBLISHED_FILES_FIELDS + self._bundle.get_setting(
-            "published_file_fields", []
-        )
+        if self._published_file_fields is None:
+            self._published_file_fields = tuple(
+                constants.PUBLISHED_FILES_FIELDS
+                + self._bundle.get_setting("published_file_fields", [])
+            )
+        return list(self._published_file_fields)
 
     def get_published_file_filters(self):
         """
@@ -154,7 +228,7 @@ class BreakdownManager(object):
 
         return self._bundle.get_setting("published_file_filters", [])
 
-    def get_latest_published_file(self, item, data_retriever=None):
+    def get_latest_published_file(self, item, data_retriever=None, extra_fields=None):
         """
         Get the latest available published file according to the current item context.
 
@@ -163,6 +237,9 @@ class BreakdownManager(object):
         :param data_retreiver: If provided, the api request will be async. The default value
             will execute the api request synchronously.
         :type data_retriever: ShotgunDataRetriever
+        :param extra_fields: A list of ShotGrid fields to append to the ShotGrid query
+                             for the latest published file.
+        :type extra_fields: List[str]
 
         :return: The latest published file as a ShotGrid entity dictionary if the request was
             synchronous, else the request background task id if the request was async.
@@ -171,11 +248,14 @@ class BreakdownManager(object):
         if not item or not item.sg_data:
             return None if data_retriever else {}
 
+        hook_kwargs = {"item": item, "data_retriever": data_retriever}
+        # Custom hooks may not accept the extra fields.
+        if self._hook_method_accepts(
+            "hook_get_published_files", "get_latest_published_file", "extra_fields"
+        ):
+            hook_kwargs["extra_fields"] = self._get_query_fields(extra_fields)
         result = self._bundle.execute_hook_method(
-            "hook_get_published_files",
-            "get_latest_published_file",
-            item=item,
-            data_retriever=data_retriever,
+            "hook_get_published_files", "get_latest_published_file", **hook_kwargs
         )
 
         # Only set the latest published file data if the result was immediately returned.
@@ -184,8 +264,10 @@ class BreakdownManager(object):
 
         return result
 
-    @sgtk.LogManager.log_timing
-    def get_published_files_for_items(self, items, data_retriever=None):
+    @_timed
+    def get_published_files_for_items(
+        self, items, data_retriever=None, extra_fields=None
+    ):
         """
         Get all published files for the given items.
 
@@ -197,23 +279,78 @@ class BreakdownManager(object):
         :param data_retreiver: If provided, the api request will be async. The default value
             will execute the api request synchronously.
         :type data_retriever: ShotgunDataRetriever
+        :param extra_fields: A list of ShotGrid fields to append to the ShotGrid query
+                             for published files.
+        :type extra_fields: List[str]
 
         :return: If the request is async, then the request task id is returned, else the
-            published file data result from the api request.
+            published file data result from the api request, sorted from the latest
+            published file to the oldest. Async results can be sorted with
+            :meth:`sort_published_files`.
         :rtype: str | dict
         """
 
         if not items:
             return None if data_retriever else {}
 
-        return self._bundle.execute_hook_method(
-            "hook_get_published_files",
-            "get_published_files_for_items",
-            items=items,
-            data_retriever=data_retriever,
-            filters=self.get_published_file_filters()
+        hook_kwargs = {
+            "items": items,
+            "data_retriever": data_retriever,
+            "filters": self.get_published_file_filters(),
+        }
+        # Custom hooks may not accept the extra fields.
+        if self._hook_method_accepts(
+            "hook_get_published_files", "get_published_files_for_items", "extra_fields"
+        ):
+            hook_kwargs["extra_fields"] = self._get_query_fields(extra_fields)
+        result = self._bundle.execute_hook_method(
+            "hook_get_published_files", "get_published_files_for_items", **hook_kwargs
         )
 
+        if data_retriever is None:
+            return self.sort_published_files(result or [])
+        return result
+
+    @staticmethod
+    def sort_published_files(published_files):
+        """
+        Sort the given published files from the latest to the oldest.
+
+        Published files are sorted by highest version number first, and then by most recent
+        creation date.
+
+        :param published_files: The published files to sort.
+        :type published_files: List[dict]
+
+        :return: The sorted published files.
+        :rtype: List[dict]
+        """
+
+        def sort_key(pf_data):
+            created_at = pf_data.get("created_at")
+            # Don't compare missing creation dates with actual ones.
+            return (
+                pf_data.get("version_number") or 0,
+                created_at is not None,
+                created_at,
+            )
+
+        return sorted(published_files, key=sort_key, reverse=True)
+
+    def clear_published_files_cache(self):
+        """
+        Clear the published files query results cached by the manager and by the published
+        files hook.
+
+        This should be called when the data is explicitly refreshed.
+        """
+
+        with self._cache_lock:
+            self._pf_cache.clear()
+        # Custom hooks may not implement the method.
+        if callable(self._get_hook_method("hook_get_published_files", "clear_cache")):
+            self._bundle.execute_hook_method("hook_get_published_files", "clear_cache")
+
     def get_published_file_history(self, item, extra_fields=None):
         """
         Get the published history for the selected item. It will gather all the published files with the same context
@@ -230,9 +367,7 @@ class BreakdownManager(object):
         if not item.sg_data:
             return []
 
-        fields = constants.PUBLISHED_FILES_FIELDS + self._bundle.get_setting(
-            "published_file_fields", []
-        )
+        fields = self.get_published_file_fields()
         if extra_fields is not None:
             fields += extra_fields
 
@@ -244,12 +379,24 @@ class BreakdownManager(object):
             ["published_file_type", "is", item.sg_data["published_file_type"]],
         ]
 
-        pfs = self._bundle.shotgun.find(
-            "PublishedFile",
-            filters=filters,
-            fields=fields,
-            order=[{"direction": "desc", "field_name": "version_number"}],
+        cache_key = (
+            "history",
+            self._get_hashable(filters),
+            self._get_hashable(fields),
         )
+        pfs = self._get_cached_result(cache_key)
+        if pfs is None:
+            pfs = self._bundle.shotgun.find(
+                "PublishedFile",
+                filters=filters,
+                fields=fields,
+                order=[{"direction": "desc", "field_name": "version_number"}],
+            )
+            if pfs:
+                # Don't cache empty results, the first version may be published any time.
+                self._set_cached_result(cache_key, pfs)
+        # Don't let the cached data be modified.
+        pfs = [dict(pf) for pf in pfs]
 
         if pfs:
             item.latest_published_file = pfs[0]
@@ -289,6 +436,10 @@ class BreakdownManager(object):
         :rtype: bool
         """
 
+        up_to_date = self._update_if_up_to_date(item, sg_data)
+        if up_to_date is not None:
+            return up_to_date
+
         item_dict = item.to_dict()
         item_dict["sg_data"] = sg_data
 
@@ -298,11 +449,263 @@ class BreakdownManager(object):
             item=item_dict,
         )
 
+        return self._apply_update(item, item_dict, new_path)
+
+    def update_items(self, items):
+        """
+        Update the given items to their latest version.
+
+        If the scene operations hook implements an `update_batch` method, all the items are
+        updated with a single call to it, which receives the list of items and returns the
+        list of paths set on them. Otherwise, the items are updated one by one with the hook
+        `update` method.
+
+        :param items: Items to update
+        :type items: List[FileItem]
+
+        :return: For each item, True if the item requires the data model to update, else
+            False will not trigger a model update.
+        :rtype: List[bool]
+        """
+
+        results = [False] * len(items)
+        batch = []
+        for index, item in enumerate(items):
+            if not item.latest_published_file:
+                continue
+            up_to_date = self._update_if_up_to_date(item, item.latest_published_file)
+            if up_to_date is not None:
+                results[index] = up_to_date
+            else:
+                batch.append(index)
+
+        if not batch:
+            return results
+
+        if not self._scene_operations_hook_has_method("update_batch"):
+            for index in batch:
+                results[index] = self.update_to_latest_version(items[index])
+            return results
+
+        item_dicts = []
+        for index in batch:
+            item_dict = items[index].to_dict()
+            item_dict["sg_data"] = items[index].latest_published_file
+            item_dicts.append(item_dict)
+
+        new_paths = self._bundle.execute_hook_method(
+            "hook_scene_operations",
+            "update_batch",
+            items=item_dicts,
+        )
+
+        for index, item_dict, new_path in zip(batch, item_dicts, new_paths):
+            results[index] = self._apply_update(items[index], item_dict, new_path)
+        return results
+
+    def _update_if_up_to_date(self, item, sg_data):
+        """
+        Update the item data without updating the scene, if the item already references
+        the file of the given published file.
+
+        :param item: Item to update
+        :type item: FileItem
+        :param sg_data: Dictionary of ShotGrid data representing the published file we want to update the item to
+        :type sg_data: dict
+
+        :return: None if the scene needs to be updated, else True if the item data was
+            updated and False if nothing changed.
+        :rtype: bool | None
+        """
+
+        new_local_path = ((sg_data or {}).get("path") or {}).get("local_path")
+        if not new_local_path or os.path.normpath(new_local_path) != os.path.normpath(
+            item.path or ""
+        ):
+            return None
+
+        # The item already references the file, there is nothing to update in the
+        # scene. Only update the item data if it changed.
+        if (item.sg_data or {}).get("id") == sg_data.get("id"):
+            return False
+        item.sg_data = sg_data
+        return True
+
+    def _apply_update(self, item, item_dict, new_path):
+        """
+        Update the item after the scene operations hook updated it in the scene.
+
+        :param item: The updated item
+        :type item: FileItem
+        :param item_dict: The item data passed to the hook, with the published file data
+            the item was updated to.
+        :type item_dict: dict
+        :param new_path: The path returned by the hook, or a falsy value if no update was done.
+        :type new_path: str
+
+        :return: True if the item requires the data model to update, else False will not
+            trigger a model update.
+        :rtype: bool
+        """
+
         if new_path:
             # Only update the file item if an update was done. Updating the item will affect the data
             # model directly
-            item.sg_data = sg_data
+            item.sg_data = item_dict["sg_data"]
             item.path = new_path
             item.extra_data = item_dict["extra_data"]
+            self._invalidate_published_file_history(item.sg_data)
 
         return bool(new_path)
+
+    def _scene_operations_hook_has_method(self, method_name):
+        """
+        Check if the scene operations hook implements the given method.
+
+        :param method_name: The name of the hook method.
+        :type method_name: str
+
+        :return: True if the hook implements the method, else False.
+        :rtype: bool
+        """
+
+        return callable(self._get_hook_method("hook_scene_operations", method_name))
+
+    def _hook_method_accepts(self, hook_name, method_name, param_name):
+        """
+        Check if the given hook method accepts the given keyword argument.
+
+        :param hook_name: The name of the hook setting.
+        :type hook_name: str
+        :param method_name: The name of the hook method.
+        :type method_name: str
+        :param param_name: The name of the keyword argument.
+        :type param_name: str
+
+        :return: True if the hook method accepts the keyword argument, else False.
+        :rtype: bool
+        """
+
+        method = self._get_hook_method(hook_name, method_name)
+        if not callable(method):
+            return False
+
+        try:
+            parameters = inspect.signature(method).parameters
+        except (TypeError, ValueError):
+            return False
+        return param_name in parameters or any(
+            parameter.kind == parameter.VAR_KEYWORD for parameter in parameters.values()
+        )
+
+    def _get_hook_method(self, hook_name, method_name):
+        """
+        Get a method of the hook defined by the given setting.
+
+        The hook instance is only created once, to check the methods it implements. Hook
+        methods are executed with :meth:`sgtk.platform.Application.execute_hook_method`.
+
+        :param hook_name: The name of the hook setting.
+        :type hook_name: str
+        :param method_name: The name of the hook method.
+        :type method_name: str
+
+        :return: The hook method, or None if the hook does not implement it.
+        """
+
+        hook = self._hook_instances.get(hook_name)
+        if hook is None:
+            hook = self._bundle.create_hook_instance(
+                self._bundle.get_setting(hook_name)
+            )
+            self._hook_instances[hook_name] = hook
+        return getattr(hook, method_name, None)
+
+    def _get_cached_result(self, key):
+        """
+        Get the cached result of a published files query.
+
+        :param key: The query key, as returned by :meth:`_get_hashable`.
+        :type key: tuple
+
+        :return: The cached result, or None if there is no result cached for the query or if
+            it is older than the published_file_cache_timeout setting.
+        """
+
+        with self._cache_lock:
+            cached = self._pf_cache.pop(key, None)
+            if cached is None or time.time() - cached[0] >= self._cache_timeout:
+                return None
+
+            # Re-insert the result as the most recently used one.
+            self._pf_cache[key] = cached
+        return cached[1]
+
+    def _set_cached_result(self, key, result):
+        """
+        Cache the result of a published files query.
+
+        The least recently used results are discarded if more than :attr:`CACHE_MAX_SIZE`
+        results are cached.
+
+        :param key: The query key, as returned by :meth:`_get_hashable`.
+        :type key: tuple
+        :param result: The query result.
+        """
+
+        if self._cache_timeout <= 0:
+            return
+
+        with self._cache_lock:
+            self._pf_cache[key] = (time.time(), result)
+            while len(self._pf_cache) > self.CACHE_MAX_SIZE:
+                self._pf_cache.popitem(last=False)
+
+    def _invalidate_published_file_history(self, sg_data):
+        """
+        Discard the cached publish histories which may contain the given published file.
+
+        :param sg_data: The published file data.
+        :type sg_data: dict
+        """
+
+        name_filter = ("name", "is", sg_data.get("name"))
+        with self._cache_lock:
+            for key in list(self._pf_cache):
+                if key[0] == "history" and name_filter in key[1]:
+                    del self._pf_cache[key]
+
+    @classmethod
+    def _get_hashable(cls, value):
+        """
+        Return a hashable representation of the given query arguments.
+
+        :param value: The query arguments, e.g. filters or fields.
+
+        :return: A hashable value.
+        """
+
+        if isinstance(value, dict):
+            return tuple(sorted((k, cls._get_hashable(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._get_hashable(v) for v in value)
+        return value
+
+    def _get_query_fields(self, extra_fields=None):
+        """
+        Get the fields to query when retrieving the published file history of items.
+
+        The latest published file of an item may be used to update the item, it needs to
+        contain the same fields as the ones retrieved when scanning the scene.
+
+        :param extra_fields: A list of ShotGrid fields to append to the published file fields.
+        :type extra_fields: List[str]
+
+        :return: The fields to query.
+        :rtype: List[str]
+        """
+
+        fields = self.get_published_file_fields()
+        if extra_fields:
+            fields += extra_fields
+        return fields
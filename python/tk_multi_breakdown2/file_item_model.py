@@ -692,6 +692,8 @@ class FileTreeItemModel(QtCore.QAbstractItemModel, ViewItemRolesMixin):
             # Pause polling for updates while the model reloads. This will start again once
             # all async tasks are complete to reload the model.
             self.stop_timer()
+            # Make sure the data is not retrieved from previous query results.
+            self._manager.clear_published_files_cache()
 
             # Run the scan scene method in the main thread (not a background task) since this
             # may cause issues for certain DCCs
@@ -1191,7 +1193,9 @@ class FileTreeItemModel(QtCore.QAbstractItemModel, ViewItemRolesMixin):
         """
 
         return self._manager.get_published_files_for_items(
-            file_items, data_retriever=data_retriever
+            file_items,
+            data_retriever=data_retriever,
+            extra_fields=self._published_file_fields,
         )
 
     def _get_published_files_mapping(self, published_file_data):
@@ -1446,7 +1450,7 @@ class FileTreeItemModel(QtCore.QAbstractItemModel, ViewItemRolesMixin):
         elif uid == self.__pending_latest_published_files_data_request:
             self.__pending_latest_published_files_data_request = None
             published_files_mapping = self._get_published_files_mapping(
-                data.get("sg", [])
+                self._manager.sort_published_files(data.get("sg") or [])
             )
 
             if self.__is_reloading:
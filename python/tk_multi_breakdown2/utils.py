@@ -8,59 +8,87 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Autodesk, Inc.
 
+import itertools
+import weakref
+
 from .framework_qtwidgets import utils
 
+# The ShotGrid fields required by the UI, keyed by app.
+_FIELDS_CACHE = weakref.WeakKeyDictionary()
+
+# The image name of the ShotGrid thumbnail URLs when there is no thumbnail.
+_NO_PREVIEW_THUMBNAIL = "no_preview_t.jpg"
+
 
 def get_ui_published_file_fields(app):
     """
     Returns a list of ShotGrid fields we want to retrieve when querying ShotGrid. We're going through each widget
     configuration in order to be sure to have all the necessary data to fill the fields.
 
+    The fields are only resolved once per app, call :func:`invalidate_ui_published_file_fields`
+    if the UI configuration changes.
+
     :param app: The app we're running the command from
-    :returns: A list of ShotGrid Published File fields
+    :returns: A list of unique ShotGrid Published File fields, in the order they are configured
     """
 
-    fields = []
+    cached_fields = _FIELDS_CACHE.get(app)
+    if cached_fields is not None:
+        return list(cached_fields)
 
     # in order to be able to return all the needed ShotGrid fields, we need to look for the way the UI is configured
-    file_item_config = app.execute_hook_method("hook_ui_config", "file_item_details")
+    # Create the hook once, instead of once per method, custom hooks only need to implement
+    # the documented details methods.
+    ui_config_hook = app.create_hook_instance(app.get_setting("hook_ui_config"))
+    file_item_config = ui_config_hook.file_item_details()
+    main_file_history_config = ui_config_hook.main_file_history_details()
+    file_history_config = ui_config_hook.file_history_details()
+
+    # Remove duplicates while preserving the fields order.
+    fields = list(
+        dict.fromkeys(
+            itertools.chain(
+                _iter_cfg_fields(file_item_config, ("top_left", "top_right", "body")),
+                _iter_cfg_fields(main_file_history_config, ("header", "body")),
+                _iter_cfg_fields(
+                    file_history_config, ("top_left", "top_right", "body")
+                ),
+            )
+        )
+    )
+    _FIELDS_CACHE[app] = fields
+    return list(fields)
 
-    fields += utils.resolve_sg_fields(file_item_config.get("top_left"))
-    fields += utils.resolve_sg_fields(file_item_config.get("top_right"))
-    fields += utils.resolve_sg_fields(file_item_config.get("body"))
-    if file_item_config["thumbnail"]:
-        fields.append("image")
-        # Add the linked Version's image field to be able to fall back on it if needed.
-        fields.append("version.Version.image")
 
-    main_file_history_config = app.execute_hook_method(
-        "hook_ui_config", "main_file_history_details"
-    )
+def _iter_cfg_fields(config, keys):
+    """
+    Yield the ShotGrid fields required to display a widget configuration.
 
-    fields += utils.resolve_sg_fields(main_file_history_config.get("header"))
-    fields += utils.resolve_sg_fields(main_file_history_config.get("body"))
-    if main_file_history_config["thumbnail"]:
-        if "image" not in fields:
-            fields.append("image")
+    :param config: The widget configuration returned by the ui config hook
+    :param keys: The configuration keys holding the strings to resolve the fields from
+    :returns: A generator of ShotGrid Published File fields, possibly with duplicates
+    """
+
+    resolve_sg_fields = utils.resolve_sg_fields
+    for field in itertools.chain.from_iterable(
+        resolve_sg_fields(config.get(key)) for key in keys
+    ):
+        yield field
+
+    if config["thumbnail"]:
+        yield "image"
         # Add the linked Version's image field to be able to fall back on it if needed.
-        if "version.Version.image" not in fields:
-            fields.append("version.Version.image")
+        yield "version.Version.image"
 
-    file_history_config = app.execute_hook_method(
-        "hook_ui_config", "file_history_details"
-    )
 
-    fields += utils.resolve_sg_fields(file_history_config.get("top_left"))
-    fields += utils.resolve_sg_fields(file_history_config.get("top_right"))
-    fields += utils.resolve_sg_fields(file_history_config.get("body"))
-    if file_history_config["thumbnail"]:
-        if "image" not in fields:
-            fields.append("image")
-        # Add the linked Version's image field to be able to fallback on it if needed.
-        if "version.Version.image" not in fields:
-            fields.append("version.Version.image")
+def invalidate_ui_published_file_fields(app):
+    """
+    Discard the ShotGrid fields required by the UI cached for the given app.
+
+    :param app: The app to discard the fields for.
+    """
 
-    return list(set(fields))
+    _FIELDS_CACHE.pop(app, None)
 
 
 def get_thumbnail_field_for_item(item, use_version_thumbnail_as_fallback=True):
@@ -83,11 +111,11 @@ def get_thumbnail_field_for_item(item, use_version_thumbnail_as_fallback=True):
     if not sg_data:
         return None
     # When it's an empty thumbnail, it's an AWS link with a "no_preview_t.jpg" image.
-    if sg_data.get("image") and "no_preview_t.jpg" not in sg_data.get("image"):
+    image = sg_data.get("image")
+    if image and _NO_PREVIEW_THUMBNAIL not in image:
         return "image"
-    elif (
-            use_version_thumbnail_as_fallback and sg_data.get("version.Version.image")
-            and "no_preview_t.jpg" not in sg_data.get("version.Version.image")
-    ):
-        return "version.Version.image"
+    if use_version_thumbnail_as_fallback:
+        version_image = sg_data.get("version.Version.image")
+        if version_image and _NO_PREVIEW_THUMBNAIL not in version_image:
+            return "version.Version.image"
     return None
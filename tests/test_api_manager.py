@@ -260,6 +260,48 @@ def test_get_latest_published_file(bundle, file_item_data):
         assert scene_item.latest_published_file == latest
 
 
+def test_get_published_files_for_items_custom_hook(bundle):
+    """
+    Test the BreakdownManager 'get_published_files_for_items' method only passes the
+    extra fields to the published files hook if the hook method accepts them.
+    """
+
+    class CustomHook(object):
+        def get_published_files_for_items(
+            self, items, data_retriever=None, filters=None
+        ):
+            pass
+
+    manager = BreakdownManager(bundle)
+    item = FileItem("node", "reference", "/path", {"id": 1})
+
+    with patch.object(
+        bundle, "create_hook_instance", return_value=CustomHook()
+    ), patch.object(
+        bundle, "execute_hook_method", return_value=[]
+    ) as execute_hook_method_mock:
+        manager.get_published_files_for_items([item], extra_fields=["some_field"])
+        assert "extra_fields" not in execute_hook_method_mock.call_args[1]
+
+
+def test_sort_published_files():
+    """
+    Test the BreakdownManager 'sort_published_files' method sorts published files from the
+    highest version to the lowest, and then from the most recent to the oldest.
+    """
+
+    now = datetime.datetime.now()
+    published_files = [
+        {"id": 1, "version_number": 1, "created_at": now},
+        {"id": 2, "version_number": 2, "created_at": None},
+        {"id": 3, "version_number": 2, "created_at": now},
+        {"id": 4, "version_number": None, "created_at": now},
+    ]
+
+    result = BreakdownManager.sort_published_files(published_files)
+    assert [pf["id"] for pf in result] == [3, 2, 1, 4]
+
+
 @pytest.mark.parametrize(
     "file_item_data",
     [
@@ -323,6 +365,42 @@ def test_get_published_file_history(bundle, file_item_data):
             assert item.latest_published_file == latest_published_file_before_update
 
 
+def test_get_published_file_history_cache(bundle):
+    """
+    Test the BreakdownManager 'get_published_file_history' method reuses the result of
+    identical queries, until the history is invalidated by an update.
+    """
+
+    manager = BreakdownManager(bundle)
+    # Caching is disabled by default.
+    manager._cache_timeout = 60
+    sg_data = {
+        "project": {"type": "Project", "id": 1},
+        "name": "some name",
+        "task": {"type": "Task", "id": 2},
+        "entity": {"type": "Asset", "id": 3},
+        "published_file_type": {"type": "PublishedFileType", "id": 4},
+    }
+    item = FileItem("node", "reference", "/path", sg_data)
+
+    with patch.object(bundle.shotgun, "find", wraps=bundle.shotgun.find) as find_mock:
+        first_result = manager.get_published_file_history(item)
+        second_result = manager.get_published_file_history(item)
+        assert find_mock.call_count == 1
+        assert first_result == second_result
+        # The cached data is not shared with the caller.
+        assert first_result[0] is not second_result[0]
+
+        manager._invalidate_published_file_history(sg_data)
+        manager.get_published_file_history(item)
+        assert find_mock.call_count == 2
+
+        # An explicit refresh discards the cached results.
+        manager.clear_published_files_cache()
+        manager.get_published_file_history(item)
+        assert find_mock.call_count == 3
+
+
 @pytest.mark.parametrize(
     "file_item_data",
     [
@@ -445,6 +523,41 @@ def test_update_to_specific_version(bundle, file_item_data, sg_data):
     assert item.sg_data == expected_item_sg_data
 
 
+def test_update_items(bundle):
+    """
+    Test the BreakdownManager 'update_items' method updates all items with a single call
+    to the scene operations hook 'update_batch' method.
+    """
+
+    manager = BreakdownManager(bundle)
+    items = []
+    for i in range(3):
+        item = FileItem("node%d" % i, "reference", "/path/v1/%d" % i, {"id": i})
+        item.latest_published_file = {
+            "id": i + 10,
+            "path": {"local_path": "/path/v2/%d" % i},
+        }
+        items.append(item)
+    # An item without a latest published file is not updated.
+    items.append(FileItem("node", "reference", "/path", {"id": 3}))
+
+    def execute_hook_method(hook_name, hook_method, **kwargs):
+        return [item["sg_data"]["path"]["local_path"] for item in kwargs["items"]]
+
+    with patch.object(
+        manager, "_scene_operations_hook_has_method", return_value=True
+    ), patch.object(
+        bundle, "execute_hook_method", side_effect=execute_hook_method
+    ) as execute_hook_method_mock:
+        result = manager.update_items(items)
+        execute_hook_method_mock.assert_called_once()
+
+    assert result == [True, True, True, False]
+    for i, item in enumerate(items[:3]):
+        assert item.path == "/path/v2/%d" % i
+        assert item.sg_data["id"] == i + 10
+
+
 class TestBreakdownManager(AppTestBase):
     """
     This test class purpose is to more completely test the BreakdownManager.